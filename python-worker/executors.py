@@ -3,8 +3,9 @@ Workflow Executors for ML Worker
 Implements simple-workflow WorkflowExecutor interface
 """
 
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # Import from simple-workflow library
 import sys
@@ -21,18 +22,28 @@ if os.path.exists(simple_workflow_path):
 
 from simpleworkflow import WorkflowExecutor
 
-# Import ML workflows
-from workflows.object_detection import detect_objects_workflow
-from workflows.ocr import ocr_workflow
+# ML workflow modules are imported lazily inside the execute paths: they pull
+# torch/paddle, which a process that never executes an intent shouldn't pay for
 
 logger = logging.getLogger(__name__)
 
+# Max intents per batched inference call ("one-or-all" batching)
+BATCH_MAX = int(os.getenv('BATCH_MAX', '8'))
+
 
 class MLWorkflowExecutor(WorkflowExecutor):
     """
     Executor for ML workflows (OCR and Object Detection)
     """
 
+    def __init__(self, on_execute=None):
+        """
+        Args:
+            on_execute: Optional callback invoked once per executed intent
+                        (used to feed the adaptive poll schedule)
+        """
+        self.on_execute = on_execute
+
     def execute(self, intent: Dict[str, Any]) -> Any:
         """
         Execute ML workflow based on intent name
@@ -49,7 +60,10 @@ class MLWorkflowExecutor(WorkflowExecutor):
         workflow_name = intent['name']
         payload = intent['payload']
 
-        logger.info(f"Executing ML workflow: {workflow_name}")
+        logger.info("Executing ML workflow: %s", workflow_name)
+
+        if self.on_execute:
+            self.on_execute()
 
         if workflow_name == 'content.ocr.v1':
             return self._execute_ocr(payload)
@@ -61,28 +75,130 @@ class MLWorkflowExecutor(WorkflowExecutor):
                 f"Supported: ['content.ocr.v1', 'content.object_detection.v1']"
             )
 
+    def execute_batch(self, intents: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Execute several intents, batching same-workflow ones into a single
+        inference pass
+
+        Intents are grouped by workflow name and metadata (model variant /
+        language must match to share a forward pass) and dispatched in chunks
+        of at most BATCH_MAX. While one chunk runs inference, the next
+        chunk's images are prefetched into the shared image cache so its
+        download stage overlaps this chunk's compute. Per-intent failures
+        are returned as {'success': False, 'error': ...} rather than
+        failing the batch.
+
+        Args:
+            intents: List of intent dicts as passed to `execute`
+
+        Returns:
+            List of workflow results aligned with the input order
+        """
+        if len(intents) == 1:
+            return [self.execute(intents[0])]
+
+        logger.info("Executing batch of %d ML intents", len(intents))
+
+        # Group by (workflow name, metadata) so each chunk shares one engine
+        groups: Dict[str, List[int]] = {}
+        for index, intent in enumerate(intents):
+            metadata = intent['payload'].get('metadata', {})
+            key = f"{intent['name']}|{json.dumps(metadata, sort_keys=True, default=str)}"
+            groups.setdefault(key, []).append(index)
+
+        chunks: List[List[int]] = []
+        for indexes in groups.values():
+            for start in range(0, len(indexes), BATCH_MAX):
+                chunks.append(indexes[start:start + BATCH_MAX])
+
+        results: Dict[int, Any] = {}
+        for position, chunk in enumerate(chunks):
+            if position + 1 < len(chunks):
+                self._prefetch_chunk([intents[i] for i in chunks[position + 1]])
+            chunk_results = self._execute_chunk([intents[i] for i in chunk])
+            for index, result in zip(chunk, chunk_results):
+                results[index] = result
+
+        return [results[index] for index in range(len(intents))]
+
+    @staticmethod
+    def _prefetch_chunk(intents: List[Dict[str, Any]]):
+        """
+        Start background downloads of a chunk's images into the image cache
+
+        Fire-and-forget on the shared I/O pool: the chunk's workflow asks for
+        the same content ids and either hits the cache or joins the in-flight
+        load. Errors are swallowed here — the workflow's own download attempt
+        surfaces them per intent.
+        """
+        from workflows.http_client import ContentHTTPClient
+        from workflows.image_cache import load_image_array
+        from workflows.pipeline import io_pool
+
+        def _fetch(payload):
+            metadata = payload.get('metadata', {})
+            content_api_url = metadata.get('content_api_url') or \
+                os.environ.get('CONTENT_API_URL', 'http://localhost:8080')
+            try:
+                load_image_array(ContentHTTPClient(content_api_url),
+                                 payload['content_id'])
+            except Exception as e:
+                logger.debug("Prefetch failed for content_id=%s: %s",
+                             payload.get('content_id'), e)
+
+        for intent in intents:
+            io_pool().submit(_fetch, intent['payload'])
+
+    def _execute_chunk(self, intents: List[Dict[str, Any]]) -> List[Any]:
+        """Run one same-workflow chunk through the batched workflow"""
+        workflow_name = intents[0]['name']
+        content_ids = [intent['payload']['content_id'] for intent in intents]
+        metadata = intents[0]['payload'].get('metadata', {})
+
+        if self.on_execute:
+            for _ in intents:
+                self.on_execute()
+
+        if workflow_name == 'content.ocr.v1':
+            from workflows.ocr import ocr_batch_workflow
+            return ocr_batch_workflow(content_ids, metadata)
+        elif workflow_name == 'content.object_detection.v1':
+            from workflows.object_detection import detect_objects_batch_workflow
+            return detect_objects_batch_workflow(content_ids, metadata)
+        else:
+            error = (
+                f"Unknown workflow: {workflow_name}. "
+                f"Supported: ['content.ocr.v1', 'content.object_detection.v1']"
+            )
+            logger.error(error)
+            return [{'success': False, 'error': error} for _ in intents]
+
     def _execute_ocr(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Execute OCR workflow"""
+        from workflows.ocr import ocr_workflow
+
         content_id = payload['content_id']
         metadata = payload.get('metadata', {})
 
-        logger.info(f"Executing OCR for content_id={content_id}")
+        logger.info("Executing OCR for content_id=%s", content_id)
 
         # Execute OCR workflow
         result = ocr_workflow(content_id, metadata)
 
-        logger.info(f"OCR completed for content_id={content_id}")
+        logger.info("OCR completed for content_id=%s", content_id)
         return result
 
     def _execute_object_detection(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Execute object detection workflow"""
+        from workflows.object_detection import detect_objects_workflow
+
         content_id = payload['content_id']
         metadata = payload.get('metadata', {})
 
-        logger.info(f"Executing object detection for content_id={content_id}")
+        logger.info("Executing object detection for content_id=%s", content_id)
 
         # Execute object detection workflow
         result = detect_objects_workflow(content_id, metadata)
 
-        logger.info(f"Object detection completed for content_id={content_id}")
+        logger.info("Object detection completed for content_id=%s", content_id)
         return result
@@ -0,0 +1,105 @@
+"""
+Logging helpers for the ML worker
+
+Workflow progress logging is hot-path work: f-string messages pay string
+formatting whether or not the record is emitted, and at high intent rates the
+INFO chatter itself becomes measurable CPU and log-pipeline I/O. This module
+provides:
+
+- configure_logging(): one-call setup, plain text by default or structured
+  JSON lines with LOG_FORMAT=json (run_id becomes an indexable field instead
+  of a re-parsed "[run-id]" prefix)
+- SampledLogger: emits every Nth INFO/DEBUG record per workflow run
+  (LOG_SAMPLE_RATE, default 1 = unsampled); WARNING and above always pass
+
+Messages should use lazy %-style arguments (logger.info("... %s", value)) so
+formatting only happens for records that are actually emitted.
+"""
+
+import json
+import logging
+import os
+import threading
+
+# Emit 1-in-N INFO/DEBUG records per workflow run (1 = log everything)
+LOG_SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', '1') or '1')
+
+# Attributes present on every LogRecord; anything else came in via extra=
+_STANDARD_RECORD_ATTRS = frozenset(
+    logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON lines with extra= fields promoted to keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """Configure root logging: text by default, JSON lines with LOG_FORMAT=json"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if os.getenv('LOG_FORMAT', '').lower() == 'json':
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(JsonFormatter())
+
+
+class SampledLogger:
+    """
+    Logger proxy that down-samples INFO/DEBUG per workflow run
+
+    Records carrying extra={'run_id': ...} are counted per run id and only
+    every LOG_SAMPLE_RATE-th one is emitted, so under load each workflow
+    contributes a trace line or two instead of its full narration. WARNING,
+    ERROR, and exception records are never sampled.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rate: int = LOG_SAMPLE_RATE):
+        self._logger = logger
+        self._rate = max(1, sample_rate)
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def _should_emit(self, extra) -> bool:
+        if self._rate <= 1:
+            return True
+        key = (extra or {}).get('run_id')
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            # Bound the per-run counters; run ids are unique per workflow
+            if len(self._counts) > 4096:
+                self._counts.clear()
+        return count % self._rate == 0
+
+    def debug(self, msg, *args, extra=None, **kwargs):
+        if self._logger.isEnabledFor(logging.DEBUG) and self._should_emit(extra):
+            self._logger.debug(msg, *args, extra=extra, **kwargs)
+
+    def info(self, msg, *args, extra=None, **kwargs):
+        if self._logger.isEnabledFor(logging.INFO) and self._should_emit(extra):
+            self._logger.info(msg, *args, extra=extra, **kwargs)
+
+    # WARNING and above bypass sampling entirely
+    def warning(self, msg, *args, **kwargs):
+        self._logger.warning(msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self._logger.error(msg, *args, **kwargs)
+
+    def exception(self, msg, *args, **kwargs):
+        self._logger.exception(msg, *args, **kwargs)
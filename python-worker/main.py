@@ -4,18 +4,41 @@ Python ML Worker for simple-content-pipeline
 Handles OCR and object detection workflows using DBOS
 """
 
+import asyncio
+import importlib
 import os
 import sys
 import logging
 import threading
 from dotenv import load_dotenv
+
+# Load environment variables before the ML imports so thread pinning below
+# sees DBOS_QUEUE_CONCURRENCY and any explicit *_NUM_THREADS overrides
+load_dotenv()
+
+# Pin intra-op threads per worker before any torch/paddle import: with
+# DBOS_QUEUE_CONCURRENCY concurrent workflows, letting each BLAS/OMP runtime
+# grab every core oversubscribes the host and thrashes on context switches
+_threads_per_worker = str(max(
+    1, (os.cpu_count() or 1) // max(1, int(os.getenv('DBOS_QUEUE_CONCURRENCY', '4')))
+))
+for _var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS',
+             'OPENBLAS_NUM_THREADS', 'PADDLE_NUM_THREADS'):
+    os.environ.setdefault(_var, _threads_per_worker)
+
 from fastapi import FastAPI, Response
 from prometheus_client import generate_latest, REGISTRY
 import uvicorn
 
+# Use uvloop as the event loop when available (Linux/macOS): lower per-poll
+# CPU overhead and wakeup latency than the default selector loop
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+
 from dbos import DBOS
-from workflows.object_detection import detect_objects_workflow
-from workflows.ocr import ocr_workflow
 
 # Add simple-workflow python package to path
 simple_workflow_path = os.path.join(
@@ -29,15 +52,11 @@ if os.path.exists(simple_workflow_path):
 from simpleworkflow import IntentPoller
 from simpleworkflow.metrics import PrometheusMetrics
 from executors import MLWorkflowExecutor
+from logging_utils import configure_logging
+from polling import AdaptivePollInterval, IntentNotifyListener
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (plain text, or JSON lines with LOG_FORMAT=json)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Parse configuration from environment
@@ -48,11 +67,11 @@ concurrency = int(os.getenv('DBOS_QUEUE_CONCURRENCY', '4'))
 app_version = os.getenv('DBOS_APPLICATION_VERSION', '')
 
 logger.info("Initializing Python ML Worker")
-logger.info(f"  Database: {dbos_db_url.split('@')[1]}")  # Hide password
-logger.info(f"  Queue: {queue_name}")
-logger.info(f"  Concurrency: {concurrency}")
+logger.info("  Database: %s", dbos_db_url.split('@')[1])  # Hide password
+logger.info("  Queue: %s", queue_name)
+logger.info("  Concurrency: %d", concurrency)
 if app_version:
-    logger.info(f"  Application Version: {app_version}")
+    logger.info("  Application Version: %s", app_version)
 
 # Initialize DBOS with queue configuration
 # Use shared app name and application version to be part of same DBOS application
@@ -69,24 +88,48 @@ dbos = DBOS(
     }
 )
 
-logger.info("✓ Registered workflows:")
-logger.info("  - detect_objects_workflow (OCR and object detection)")
-logger.info("  - ocr_workflow (OCR text extraction)")
-logger.info(f"Python ML worker ready to process workflows from queue: {queue_name}")
+def _register_workflows():
+    """
+    Import the ML workflow modules, registering their DBOS workflows
+
+    torch + paddlepaddle imports cost seconds and hundreds of MB of RSS, so
+    they are deferred until the DBOS instance exists instead of paid at
+    module import. ML_WORKFLOWS_ENABLED=0 skips them entirely for a
+    poller/metrics-only process that never executes ML intents.
+    """
+    if os.getenv('ML_WORKFLOWS_ENABLED', '1') == '0':
+        logger.warning("⚠ ML workflows disabled (ML_WORKFLOWS_ENABLED=0)")
+        return
+    importlib.import_module('workflows.object_detection')
+    importlib.import_module('workflows.ocr')
+    logger.info("✓ Registered workflows:")
+    logger.info("  - detect_objects_workflow (OCR and object detection)")
+    logger.info("  - ocr_workflow (OCR text extraction)")
+
+
+_register_workflows()
+logger.info("Python ML worker ready to process workflows from queue: %s", queue_name)
 
 # Initialize intent poller for simple-workflow integration
 workflow_db_url = os.getenv('WORKFLOW_DATABASE_URL', '')
 intent_poller = None
 
 if workflow_db_url:
+    # Keep the plain URL for the LISTEN connection (libpq rejects the
+    # search_path query parameter the poller understands)
+    notify_db_url = workflow_db_url
+
     # Add search_path=workflow to connection string
     if '?' in workflow_db_url:
         workflow_db_url += '&search_path=workflow'
     else:
         workflow_db_url += '?search_path=workflow'
 
-    # Create ML executor
-    ml_executor = MLWorkflowExecutor()
+    # Adaptive poll schedule: HOT after a hit, geometric backoff when idle
+    poll_schedule = AdaptivePollInterval.from_env()
+
+    # Create ML executor (feeds the poll schedule on every executed intent)
+    ml_executor = MLWorkflowExecutor(on_execute=poll_schedule.record_hit)
 
     # Initialize Prometheus metrics
     metrics = PrometheusMetrics()
@@ -98,7 +141,7 @@ if workflow_db_url:
         db_url=workflow_db_url,
         supported_workflows=supported_workflows,
         worker_id='python-ml-worker',
-        poll_interval=2,
+        poll_interval=poll_schedule,
         metrics=metrics
     )
 
@@ -107,8 +150,21 @@ if workflow_db_url:
     intent_poller.register_executor('content.object_detection.v1', ml_executor)
 
     logger.info("✓ Simple-workflow intent poller configured")
-    logger.info(f"  Supported workflows: {supported_workflows}")
-    logger.info(f"  Worker ID: python-ml-worker")
+    logger.info("  Supported workflows: %s", supported_workflows)
+    logger.info("  Worker ID: python-ml-worker")
+
+    # Push wakeups: LISTEN for pg_notify from the intent-insert trigger
+    # (scripts/intent-notify-trigger.sql); a notification interrupts the
+    # current poll wait, and once notifications are observed the timed poll
+    # stretches into a slow recovery fallback. If the trigger is not
+    # installed the schedule keeps its normal ceiling. Disable with
+    # INTENT_NOTIFY=0.
+    if os.getenv('INTENT_NOTIFY', '1') != '0':
+        notify_listener = IntentNotifyListener(notify_db_url,
+                                               on_notify=poll_schedule.wake)
+        notify_listener.start()
+        poll_schedule.enable_push_mode()
+        logger.info("✓ LISTEN/NOTIFY intent wakeup enabled")
 else:
     logger.warning("⚠ WORKFLOW_DATABASE_URL not set, intent poller disabled (using DBOS queue fallback)")
 
@@ -123,43 +179,89 @@ async def health():
 async def metrics_endpoint():
     return Response(content=generate_latest(REGISTRY), media_type='text/plain')
 
-if __name__ == '__main__':
-    try:
-        # Get HTTP port from environment
-        worker_http_addr = os.getenv('WORKER_HTTP_ADDR', ':8082')
-        metrics_port = int(worker_http_addr.split(':')[-1])
-
-        # Start FastAPI metrics server in background thread using uvicorn
-        metrics_thread = threading.Thread(
-            target=lambda: uvicorn.run(app, host='0.0.0.0', port=metrics_port, log_level='warning'),
-            daemon=True
-        )
-        metrics_thread.start()
-        logger.info(f"✓ Metrics server started on :{metrics_port}")
-        logger.info(f"  Health endpoint: http://localhost:{metrics_port}/health")
-        logger.info(f"  Metrics endpoint: http://localhost:{metrics_port}/metrics")
-
-        # Start DBOS worker in background thread
-        logger.info("Starting DBOS worker...")
-        dbos_thread = threading.Thread(target=DBOS.launch, daemon=True)
-        dbos_thread.start()
-
-        # Wait for DBOS to initialize
-        import time
-        time.sleep(3)
-
-        # Now start intent poller after DBOS is ready
-        if intent_poller:
+def _apply_queue_concurrency(limit: int):
+    """
+    Best-effort runtime update of the DBOS queue concurrency limit
+
+    dbos has no public setter; reach for the registered Queue object and
+    update its concurrency attribute, falling back to logging the
+    recommendation when this dbos version doesn't expose it.
+    """
+    registry = getattr(dbos, '_registry', None)
+    queues = getattr(registry, 'queue_info_map', None) if registry else None
+    queue = queues.get(queue_name) if isinstance(queues, dict) else None
+    if queue is not None and hasattr(queue, 'concurrency'):
+        queue.concurrency = limit
+        logger.info("Queue '%s' concurrency set to %d", queue_name, limit)
+    else:
+        logger.info("Auto-tuner recommends concurrency=%d for queue '%s' "
+                    "(runtime update unsupported by this dbos version)", limit, queue_name)
+
+
+async def serve():
+    """Run the metrics server, DBOS worker, and intent poller on one event loop"""
+    loop = asyncio.get_running_loop()
+
+    # Eager tasks (Python 3.12+): coroutines that complete synchronously skip
+    # the scheduling hop; earlier versions keep the default task factory
+    if hasattr(asyncio, 'eager_task_factory'):
+        loop.set_task_factory(asyncio.eager_task_factory)
+
+    # Get HTTP port from environment
+    worker_http_addr = os.getenv('WORKER_HTTP_ADDR', ':8082')
+    metrics_port = int(worker_http_addr.split(':')[-1])
+
+    # Serve FastAPI metrics directly on the event loop (no extra thread)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host='0.0.0.0', port=metrics_port, log_level='warning')
+    )
+    metrics_task = loop.create_task(server.serve())
+    logger.info("✓ Metrics server started on :%d", metrics_port)
+    logger.info("  Health endpoint: http://localhost:%d/health", metrics_port)
+    logger.info("  Metrics endpoint: http://localhost:%d/metrics", metrics_port)
+
+    # DBOS.launch blocks: keep it on a daemon thread so shutdown stays prompt
+    logger.info("Starting DBOS worker...")
+    dbos_thread = threading.Thread(target=DBOS.launch, daemon=True)
+    dbos_thread.start()
+
+    # Wait for DBOS to initialize
+    await asyncio.sleep(3)
+
+    # Now start intent poller after DBOS is ready
+    if intent_poller:
+        if hasattr(intent_poller, 'start_async'):
+            # Native asyncio poller (asyncpg-based simpleworkflow)
+            loop.create_task(intent_poller.start_async())
+        else:
+            # Synchronous psycopg2 poller: daemon thread until the library
+            # grows an async entrypoint
             poller_thread = threading.Thread(target=intent_poller.start, daemon=True)
             poller_thread.start()
-            logger.info("✓ Simple-workflow intent poller started")
+        logger.info("✓ Simple-workflow intent poller started")
+
+    # Optionally tune queue concurrency at runtime from observed queue depth
+    if os.getenv('AUTOTUNE', '0') == '1':
+        from workflows.autotuner import ConcurrencyAutoTuner
+        tuner = ConcurrencyAutoTuner(
+            db_url=dbos_db_url,
+            queue_name=queue_name,
+            apply=_apply_queue_concurrency,
+            initial=concurrency
+        )
+        loop.create_task(tuner.run())
+        logger.info("✓ Queue concurrency auto-tuner started")
 
-        # Keep main thread alive
-        while True:
-            time.sleep(1)
+    # The metrics server runs until shutdown; keep the loop alive on it
+    await metrics_task
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve())
     except KeyboardInterrupt:
         logger.info("Shutting down Python ML worker...")
         sys.exit(0)
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
         sys.exit(1)
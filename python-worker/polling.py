@@ -0,0 +1,206 @@
+"""
+Adaptive polling schedule for the simple-workflow IntentPoller
+
+Replaces the fixed poll interval with a latency-optimized schedule:
+poll aggressively right after an intent is picked up (HOT), back off
+geometrically while the queue stays idle (WARM), and settle at a slow
+ceiling for long-idle queues (COLD).
+
+IntentNotifyListener turns the poll into a push model: with the
+pg_notify trigger installed (scripts/intent-notify-trigger.sql), intent
+inserts wake the schedule immediately and timed polls become a slow
+recovery fallback for missed notifications.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# EWMA smoothing factor for inter-arrival time estimation
+_EWMA_ALPHA = 0.2
+
+# Geometric backoff multiplier applied on each empty poll
+_BACKOFF_FACTOR = 1.5
+
+
+class AdaptivePollInterval:
+    """
+    Callable poll-interval schedule for IntentPoller
+
+    Each call returns the delay (in seconds) before the next poll:
+    - HOT: minimum interval for the first `hot_count` polls after a hit
+    - WARM: geometric backoff capped at `warm_interval` while idle < `warm_idle` seconds
+    - COLD: backoff continues up to `max_interval` for long-idle queues
+
+    An EWMA of intent inter-arrival times tightens the WARM ceiling when
+    intents arrive faster than the configured warm interval.
+
+    The delay is waited out inside the call itself (the poller then sleeps
+    on the returned 0) so that `wake` can interrupt an in-progress wait and
+    trigger an immediate poll instead of waiting for the current interval
+    to elapse.
+
+    Thread-safe: `record_hit` and `wake` may be called from other threads
+    while the poller thread waits on the next delay.
+    """
+
+    def __init__(self, min_interval: float = 0.3, max_interval: float = 5.0,
+                 hot_count: int = 3, warm_interval: float = 1.0,
+                 warm_idle: float = 10.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hot_count = hot_count
+        self.warm_interval = warm_interval
+        self.warm_idle = warm_idle
+
+        self._lock = threading.Lock()
+        self._last_hit = time.monotonic()
+        self._polls_since_hit = 0
+        self._delay = min_interval
+        self._ewma_interarrival = None
+        self._wake_event = threading.Event()
+        self._fallback_interval = None  # push-mode ceiling, armed by enable_push_mode
+
+    @classmethod
+    def from_env(cls) -> 'AdaptivePollInterval':
+        """Build a schedule from POLL_MIN_MS / POLL_MAX_MS / POLL_HOT_COUNT env vars"""
+        return cls(
+            min_interval=int(os.getenv('POLL_MIN_MS', '300')) / 1000.0,
+            max_interval=int(os.getenv('POLL_MAX_MS', '5000')) / 1000.0,
+            hot_count=int(os.getenv('POLL_HOT_COUNT', '3'))
+        )
+
+    def enable_push_mode(self, fallback_interval: float = None):
+        """
+        Arm the stretched idle ceiling for push-driven operation
+
+        With LISTEN/NOTIFY wakeups active, timed polls only recover missed
+        notifications, so the COLD ceiling may grow to POLL_FALLBACK_MS
+        (default 30 s) unless an explicit fallback_interval is given. The
+        stretch is not applied until the first notification is actually
+        observed: if the pg_notify trigger is missing, the schedule keeps
+        its normal ceiling instead of idling for the fallback interval.
+        """
+        if fallback_interval is None:
+            fallback_interval = int(os.getenv('POLL_FALLBACK_MS', '30000')) / 1000.0
+        with self._lock:
+            self._fallback_interval = fallback_interval
+
+    def wake(self):
+        """A NOTIFY arrived: interrupt the current wait and poll immediately"""
+        with self._lock:
+            self._polls_since_hit = 0
+            self._delay = self.min_interval
+            # Notifications demonstrably arrive, so timed polls are now a
+            # pure fallback and the idle ceiling can stretch
+            if self._fallback_interval is not None:
+                self.max_interval = max(self.max_interval, self._fallback_interval)
+        self._wake_event.set()
+
+    def record_hit(self):
+        """Record that an intent was picked up; resets the schedule to HOT"""
+        now = time.monotonic()
+        with self._lock:
+            interarrival = now - self._last_hit
+            if self._ewma_interarrival is None:
+                self._ewma_interarrival = interarrival
+            else:
+                self._ewma_interarrival = (
+                    _EWMA_ALPHA * interarrival +
+                    (1 - _EWMA_ALPHA) * self._ewma_interarrival
+                )
+            self._last_hit = now
+            self._polls_since_hit = 0
+            self._delay = self.min_interval
+
+    def __call__(self) -> float:
+        """Wait out the next poll delay (interruptible by `wake`) and return 0"""
+        with self._lock:
+            idle = time.monotonic() - self._last_hit
+            self._polls_since_hit += 1
+
+            if self._polls_since_hit <= self.hot_count:
+                # HOT: burst of fast polls right after a hit
+                self._delay = self.min_interval
+            else:
+                # Empty poll: back off geometrically toward the phase ceiling
+                if idle < self.warm_idle:
+                    ceiling = self.warm_interval
+                    # Poll roughly twice per expected arrival when traffic is steady
+                    if self._ewma_interarrival is not None:
+                        ceiling = min(ceiling, max(self.min_interval,
+                                                   self._ewma_interarrival / 2))
+                else:
+                    ceiling = self.max_interval
+                self._delay = min(self._delay * _BACKOFF_FACTOR, ceiling)
+            delay = self._delay
+
+        # Sleep here rather than in the poller so a NOTIFY can cut the wait
+        # short; the poller sleeps on the returned 0 and polls immediately
+        if self._wake_event.wait(delay):
+            self._wake_event.clear()
+        return 0.0
+
+
+class IntentNotifyListener:
+    """
+    Postgres LISTEN/NOTIFY wakeup for the intent poller
+
+    Holds a dedicated connection listening on `channel` and invokes
+    `on_notify` whenever the PAS announces a new intent (see
+    scripts/intent-notify-trigger.sql). Wired to
+    AdaptivePollInterval.wake, a notification interrupts any in-progress
+    poll wait, so pickup happens immediately instead of after the
+    remaining backoff delay.
+
+    The listener reconnects with a delay on connection failures; if the
+    trigger is not installed it simply never fires and the timed poll
+    carries the load as before.
+    """
+
+    def __init__(self, db_url: str, on_notify, channel: str = 'intent_ready',
+                 reconnect_delay: float = 5.0):
+        self.db_url = db_url
+        self.on_notify = on_notify
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+
+    def start(self):
+        """Start listening on a daemon thread"""
+        thread = threading.Thread(target=self._run, daemon=True,
+                                  name='intent-notify-listener')
+        thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.warning("Intent notify listener disconnected: %s; "
+                               "reconnecting in %ds", e, self.reconnect_delay)
+                time.sleep(self.reconnect_delay)
+
+    def _listen(self):
+        conn = psycopg2.connect(self.db_url)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel};')
+            logger.info("✓ Listening for NOTIFY on channel: %s", self.channel)
+            while True:
+                # Block until the socket is readable (30 s keepalive check)
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    self.on_notify()
+        finally:
+            conn.close()
@@ -2,6 +2,23 @@
 Workflows package for Python ML worker
 """
 
-from .object_detection import detect_objects_workflow
+import importlib
 
-__all__ = ['detect_objects_workflow']
+# The workflow modules pull torch/paddlepaddle (seconds of import time,
+# hundreds of MB of RSS). Resolve them lazily so importing the package or its
+# lightweight members (http_client, image_cache, polling helpers) stays cheap.
+_LAZY_WORKFLOWS = {
+    'detect_objects_workflow': 'workflows.object_detection',
+    'detect_objects_batch_workflow': 'workflows.object_detection',
+    'ocr_workflow': 'workflows.ocr',
+    'ocr_batch_workflow': 'workflows.ocr',
+}
+
+__all__ = list(_LAZY_WORKFLOWS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_WORKFLOWS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'workflows' has no attribute '{name}'")
+    return getattr(importlib.import_module(module_name), name)
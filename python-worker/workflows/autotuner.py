@@ -0,0 +1,150 @@
+"""
+Runtime concurrency auto-tuner for the DBOS queue
+
+DBOS_QUEUE_CONCURRENCY is fixed at startup, but the right value shifts with
+the load mix: GPU-saturated inference wants few workers, I/O-heavy batches
+want many. The tuner samples queue depth from the DBOS system database every
+few seconds and nudges the concurrency limit up under standing backlog and
+back down when the queue drains.
+
+DBOS has no public runtime set_concurrency API, so the new limit is applied
+through a caller-provided setter (see main.py); if the installed dbos version
+doesn't support a runtime update, the tuner logs its recommendation instead.
+
+The dbos SDK keeps workflow_status in its own system database (the app
+database name suffixed with `_dbos_sys`, schema `dbos`), so the tuner derives
+that URL from the one it is given; AUTOTUNE_STATS_URL overrides the
+derivation for non-standard deployments.
+"""
+
+import asyncio
+import logging
+import os
+import urllib.parse
+from typing import Callable, Tuple
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Counts of enqueued (waiting) and pending (running) workflows on one queue
+_STATS_SQL = """
+    SELECT
+        COUNT(*) FILTER (WHERE status = 'ENQUEUED') AS queued,
+        COUNT(*) FILTER (WHERE status = 'PENDING') AS running
+    FROM {table}
+    WHERE queue_name = %s
+"""
+
+# Candidate locations of the DBOS system table across dbos versions
+_STATUS_TABLES = ('dbos.workflow_status', 'workflow_status')
+
+# Suffix the dbos SDK appends to the app database name for its system database
+_SYS_DB_SUFFIX = '_dbos_sys'
+
+
+def _system_db_url(db_url: str) -> str:
+    """Derive the DBOS system database URL from the app database URL"""
+    parsed = urllib.parse.urlsplit(db_url)
+    dbname = parsed.path.lstrip('/')
+    if not dbname or dbname.endswith(_SYS_DB_SUFFIX):
+        return db_url
+    return parsed._replace(path=f'/{dbname}{_SYS_DB_SUFFIX}').geturl()
+
+
+class ConcurrencyAutoTuner:
+    """
+    Adjusts DBOS queue concurrency from observed queue depth
+
+    Every `interval` seconds: if intents are waiting while all slots run
+    (arrival rate exceeds processing rate), raise concurrency by 2 up to
+    `max_concurrency`; if the queue is empty and utilization is below half
+    the current limit, lower it by 1 down to `min_concurrency`.
+    """
+
+    def __init__(self, db_url: str, queue_name: str,
+                 apply: Callable[[int], None], initial: int,
+                 min_concurrency: int = None, max_concurrency: int = None,
+                 interval: float = None):
+        self.db_url = db_url
+        self.queue_name = queue_name
+        self.apply = apply
+        self.current = initial
+        self.min_concurrency = min_concurrency or \
+            int(os.getenv('AUTOTUNE_MIN_CONCURRENCY', '2'))
+        self.max_concurrency = max_concurrency or \
+            int(os.getenv('AUTOTUNE_MAX_CONCURRENCY', '16'))
+        self.interval = interval or float(os.getenv('AUTOTUNE_INTERVAL_S', '10'))
+        # (url, table) that last produced a sample; probed on first use
+        self._source = None
+
+    async def run(self):
+        """Background task: sample and adjust until cancelled"""
+        logger.info("Auto-tuner watching queue '%s' (range %d-%d, every %ds)",
+                    self.queue_name, self.min_concurrency,
+                    self.max_concurrency, self.interval)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._tune)
+            except Exception as e:
+                logger.warning("Auto-tuner sample failed: %s", e)
+
+    def _tune(self):
+        queued, running = self._sample()
+
+        if queued > 0 and running >= self.current and \
+                self.current < self.max_concurrency:
+            # Standing backlog with all slots busy: arrival > processing
+            self._set(min(self.current + 2, self.max_concurrency),
+                      queued, running)
+        elif queued == 0 and running <= self.current // 2 and \
+                self.current > self.min_concurrency:
+            # Queue drained and utilization low: shed idle slots
+            self._set(self.current - 1, queued, running)
+
+    def _set(self, limit: int, queued: int, running: int):
+        logger.info("Auto-tuner: queued=%d running=%d concurrency %d -> %d",
+                    queued, running, self.current, limit)
+        self.current = limit
+        self.apply(limit)
+
+    def _sample(self) -> Tuple[int, int]:
+        """Read (queued, running) counts from the DBOS system database"""
+        last_error = None
+        for url, table in self._candidate_sources():
+            conn = None
+            try:
+                conn = psycopg2.connect(url)
+                with conn.cursor() as cursor:
+                    cursor.execute(_STATS_SQL.format(table=table),
+                                   (self.queue_name,))
+                    queued, running = cursor.fetchone()
+                self._source = (url, table)
+                return int(queued or 0), int(running or 0)
+            except (psycopg2.OperationalError,
+                    psycopg2.errors.UndefinedTable) as e:
+                last_error = e
+            finally:
+                if conn is not None:
+                    conn.close()
+        raise last_error
+
+    def _candidate_sources(self):
+        """(url, table) pairs to probe, cached once a sample succeeds"""
+        if self._source is not None:
+            return [self._source]
+        explicit = os.getenv('AUTOTUNE_STATS_URL', '')
+        if explicit:
+            urls = [explicit]
+        else:
+            # The derived system database first; the given URL second, for
+            # deployments that already point at the system database
+            urls = []
+            for url in (_system_db_url(self.db_url), self.db_url):
+                if url not in urls:
+                    urls.append(url)
+        return [(url, table) for url in urls for table in _STATUS_TABLES]
+
+
+__all__ = ['ConcurrencyAutoTuner']
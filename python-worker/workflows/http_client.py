@@ -0,0 +1,117 @@
+"""
+Shared HTTP client for the simple-content API
+
+Single home for ContentHTTPClient (previously duplicated in the OCR and
+object detection modules) and the pooled session it rides on.
+"""
+
+import contextlib
+import logging
+import os
+import socket
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# TCP keepalive on pooled connections: idle connections to the content API
+# survive NAT/LB timeouts instead of being silently dropped and re-handshaken
+_KEEPALIVE_SOCKET_OPTIONS = list(HTTPConnection.default_socket_options) + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+if hasattr(socket, 'TCP_KEEPIDLE'):  # Linux
+    _KEEPALIVE_SOCKET_OPTIONS += [
+        (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10),
+    ]
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keepalive on its pooled connections"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = _KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Pool sized for 2 HTTP calls (download + upload) per concurrent workflow,
+# with headroom for bursts; override with CONTENT_HTTP_POOL_MAXSIZE
+_POOL_MAXSIZE = int(os.getenv('CONTENT_HTTP_POOL_MAXSIZE', '0') or '0') or \
+    max(64, 4 * int(os.getenv('DBOS_QUEUE_CONCURRENCY', '4')))
+
+# Module-level pooled session shared across workflow invocations: reuses
+# TCP/TLS connections to the content API instead of handshaking per call
+_SESSION = requests.Session()
+_adapter = _KeepAliveAdapter(
+    pool_connections=32,
+    pool_maxsize=_POOL_MAXSIZE,
+    pool_block=False,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+)
+_SESSION.mount('http://', _adapter)
+_SESSION.mount('https://', _adapter)
+
+
+class ContentHTTPClient:
+    """HTTP client for accessing content via simple-content API"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.session = _SESSION
+
+    def download_content(self, content_id: str) -> bytes:
+        """Download content binary data"""
+        url = f"{self.base_url}/api/v1/contents/{content_id}/download"
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    @contextlib.contextmanager
+    def open_content(self, content_id: str):
+        """
+        Stream content binary data without materializing it in memory
+
+        Yields the streaming response; read from `response.raw` (incrementally
+        or in one go for decoders that need the full buffer). The connection
+        is released on exit.
+        """
+        url = f"{self.base_url}/api/v1/contents/{content_id}/download"
+        response = self.session.get(url, timeout=30, stream=True)
+        try:
+            response.raise_for_status()
+            # Transparently decompress gzip/deflate transfer encodings
+            response.raw.decode_content = True
+            yield response
+        finally:
+            response.close()
+
+    def upload_derived(self, parent_id: str, derivation_type: str, variant: str,
+                      data: bytes, filename: str) -> str:
+        """Upload derived content using multipart form"""
+        url = f"{self.base_url}/api/v1/contents/{parent_id}/derived"
+
+        files = {
+            'file': (filename, data, 'application/json')
+        }
+        data_form = {
+            'derivation_type': derivation_type,
+            'variant': variant
+        }
+
+        response = self.session.post(url, files=files, data=data_form, timeout=30)
+        response.raise_for_status()
+
+        result = response.json()
+        # Extract ID from nested or direct response
+        if 'data' in result and 'id' in result['data']:
+            return result['data']['id']
+        elif 'id' in result:
+            return result['id']
+        else:
+            raise ValueError(f"No ID in response: {result}")
+
+
+__all__ = ['ContentHTTPClient']
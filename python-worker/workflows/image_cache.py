@@ -0,0 +1,174 @@
+"""
+Bounded LRU cache of decoded images keyed by (content API base URL, content id)
+
+OCR and object detection intents commonly arrive for the same upload; each
+workflow used to download and decode the image independently. The cache holds
+decoded numpy arrays (bounded by total bytes, not entry count) so the second
+workflow gets a zero-copy lookup instead of repeating the HTTP download and
+decode.
+
+Arrays are BGR (cv2 channel order): that is what PaddleOCR expects and what
+ultralytics assumes for ndarray inputs, so images go from decode to inference
+without any further conversion or copy.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import NamedTuple
+
+import cachetools
+import cv2
+import numpy as np
+
+from workflows.http_client import ContentHTTPClient
+
+logger = logging.getLogger(__name__)
+
+# libjpeg-turbo SIMD decoder: 4-6x faster JPEG decode than OpenCV's default
+# path and supports DCT-domain downscaling. Optional — missing wheel or
+# native library falls back to cv2.imdecode.
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _TURBO = TurboJPEG()
+except Exception:
+    _TURBO = None
+
+# Total decoded bytes the cache may hold (default 256 MiB)
+_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Cap the decoded size: YOLO/PaddleOCR rescale internally anyway, so decoding
+# a 4K photo at full resolution only costs memory bandwidth. For JPEGs the
+# draft() hint downscales in the DCT domain, making the decode itself cheaper.
+# Set RESIZE_HINT_MAX=0 to always decode at full resolution.
+_RESIZE_HINT_MAX = int(os.getenv('RESIZE_HINT_MAX', '1280') or '0')
+
+
+class DecodedImage(NamedTuple):
+    """Decoded pixels (BGR) plus the original dimensions they map back to"""
+    array: np.ndarray
+    width: int    # original image width
+    height: int   # original image height
+    scale: float  # decoded / original size ratio (1.0 when not downscaled)
+
+
+class ImageCache:
+    """Thread-safe, byte-bounded LRU of decoded image arrays"""
+
+    def __init__(self, max_bytes: int = _MAX_BYTES):
+        self._lock = threading.Lock()
+        self._cache = cachetools.LRUCache(
+            maxsize=max_bytes,
+            getsizeof=lambda decoded: decoded.array.nbytes
+        )
+        # key -> Future for loads currently in progress, so a prefetch and a
+        # workflow asking for the same image share one download
+        self._inflight = {}
+
+    def get_or_load(self, key, loader) -> DecodedImage:
+        """Return the cached image for `key`, loading it on a miss
+
+        Concurrent calls for the same key are deduplicated: one caller runs
+        the loader, the others block on its result (or re-raise its
+        exception) instead of downloading and decoding in parallel.
+        """
+        with self._lock:
+            decoded = self._cache.get(key)
+            if decoded is not None:
+                logger.debug("Image cache hit for %s", key)
+                return decoded
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = Future()
+                self._inflight[key] = pending
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            return pending.result()
+
+        try:
+            decoded = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            try:
+                self._cache[key] = decoded
+            except ValueError:
+                # Single image larger than the whole cache budget
+                pass
+            self._inflight.pop(key, None)
+        pending.set_result(decoded)
+        return decoded
+
+
+IMAGE_CACHE = ImageCache()
+
+
+def load_image_array(client: ContentHTTPClient, content_id: str) -> DecodedImage:
+    """
+    Download and decode an image through the shared cache
+
+    Oversized images are downscaled to RESIZE_HINT_MAX on the long edge
+    (JPEG decode happens directly at the reduced size via the DCT draft
+    hint). Returns a DecodedImage carrying the original dimensions and the
+    applied scale so callers can map coordinates back; on a cache hit no
+    HTTP request or decode happens at all. The cache key includes the
+    client's base URL: metadata['content_api_url'] is a per-intent
+    override, so the same content id may name different bytes on
+    different APIs.
+    """
+    def _decode():
+        with client.open_content(content_id) as response:
+            data = response.raw.read()
+        if _TURBO is not None and data[:2] == b'\xff\xd8':
+            return _decode_jpeg_turbo(data)
+        return _decode_cv2(data)
+
+    return IMAGE_CACHE.get_or_load((client.base_url, content_id), _decode)
+
+
+def _decode_cv2(data: bytes) -> DecodedImage:
+    """Decode to a BGR array with OpenCV, honoring the resize hint"""
+    array = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if array is None:
+        raise ValueError("Could not decode image data")
+    orig_height, orig_width = array.shape[:2]
+    long_edge = max(orig_width, orig_height)
+    if _RESIZE_HINT_MAX > 0 and long_edge > _RESIZE_HINT_MAX:
+        ratio = _RESIZE_HINT_MAX / long_edge
+        array = cv2.resize(array,
+                           (round(orig_width * ratio), round(orig_height * ratio)),
+                           interpolation=cv2.INTER_AREA)
+    scale = array.shape[1] / orig_width if orig_width else 1.0
+    return DecodedImage(array, orig_width, orig_height, scale)
+
+
+def _decode_jpeg_turbo(data: bytes) -> DecodedImage:
+    """Decode a JPEG with libjpeg-turbo, downscaling in the DCT domain"""
+    orig_width, orig_height, _, _ = _TURBO.decode_header(data)
+    kwargs = {'pixel_format': TJPF_BGR}
+    long_edge = max(orig_width, orig_height)
+    if _RESIZE_HINT_MAX > 0 and long_edge > _RESIZE_HINT_MAX:
+        kwargs['scaling_factor'] = _pick_scaling_factor(long_edge)
+    array = _TURBO.decode(data, **kwargs)
+    scale = array.shape[1] / orig_width if orig_width else 1.0
+    return DecodedImage(array, orig_width, orig_height, scale)
+
+
+def _pick_scaling_factor(long_edge: int):
+    """Smallest DCT scaling factor that keeps the long edge >= the hint"""
+    best, best_size = (1, 1), long_edge
+    for num, den in _TURBO.scaling_factors:
+        size = long_edge * num // den
+        if _RESIZE_HINT_MAX <= size < best_size:
+            best, best_size = (num, den), size
+    return best
+
+
+__all__ = ['DecodedImage', 'IMAGE_CACHE', 'load_image_array']
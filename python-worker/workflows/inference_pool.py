@@ -0,0 +1,101 @@
+"""
+Optional process pool for CPU-bound inference
+
+With the in-process model singletons, concurrent workflows contend on the GIL
+for Python-side pre/postprocessing even though the kernels release it.
+Setting INFERENCE_POOL_SIZE > 0 moves inference into a pool of pre-warmed
+worker processes, one model instance each, so Python-side work scales with
+cores instead of serializing on one interpreter.
+
+Images cross the IPC boundary as numpy arrays (efficient buffer pickling);
+parsed detections / raw OCR result dicts come back, so heavyweight model
+result objects never need to be pickled.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Pool size; 0 (default) keeps inference in-process
+POOL_SIZE = int(os.getenv('INFERENCE_POOL_SIZE', '0') or '0')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    """True if inference should be routed through the process pool"""
+    return POOL_SIZE > 0
+
+
+def is_pool_worker() -> bool:
+    """True inside a pool worker process"""
+    return os.getenv('INFERENCE_POOL_WORKER') == '1'
+
+
+def owns_models() -> bool:
+    """
+    True if this process should hold (and warm) model singletons
+
+    With the pool enabled, only pool workers load models; the parent stays
+    model-free and just brokers arrays over IPC.
+    """
+    return not enabled() or is_pool_worker()
+
+
+def _init_worker():
+    """Pool initializer: mark the process and pre-warm its model instances"""
+    os.environ['INFERENCE_POOL_WORKER'] = '1'
+    import workflows.object_detection  # noqa: F401 (warms YOLO at import)
+    import workflows.ocr  # noqa: F401 (warms PaddleOCR at import)
+    logger.info("Inference pool worker ready (pid=%d)", os.getpid())
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                logger.info("Starting inference process pool (size=%d)", POOL_SIZE)
+                # forkserver: children fork from a clean server process,
+                # avoiding both re-running main.py's module-level setup
+                # (spawn) and forking a CUDA-initialized parent (fork)
+                _pool = ProcessPoolExecutor(
+                    max_workers=POOL_SIZE,
+                    mp_context=multiprocessing.get_context('forkserver'),
+                    initializer=_init_worker
+                )
+    return _pool
+
+
+def _detect_in_worker(model_variant: str, arrays: List) -> List[List[Dict[str, Any]]]:
+    """Run YOLO over a list of image arrays inside a pool worker"""
+    from workflows.object_detection import get_yolo_model, _parse_detections, _HALF
+    model = get_yolo_model(model=model_variant)
+    results = model(list(arrays), verbose=False, half=_HALF)
+    return [_parse_detections(result, model.names) for result in results]
+
+
+def _ocr_in_worker(lang: str, arrays: List) -> List:
+    """Run PaddleOCR over a list of image arrays inside a pool worker"""
+    from workflows.ocr import get_ocr_engine
+    engine = get_ocr_engine(lang=lang)
+    return engine.ocr(list(arrays))
+
+
+def detect(model_variant: str, arrays: List) -> List[List[Dict[str, Any]]]:
+    """Run object detection in the pool; returns detections per image"""
+    return _get_pool().submit(_detect_in_worker, model_variant, arrays).result()
+
+
+def ocr(lang: str, arrays: List) -> List:
+    """Run OCR in the pool; returns one PaddleOCR result dict per image"""
+    return _get_pool().submit(_ocr_in_worker, lang, arrays).result()
+
+
+__all__ = ['enabled', 'owns_models', 'detect', 'ocr']
@@ -2,19 +2,43 @@
 Object Detection Workflow using YOLO11
 """
 
-import io
-import json
 import logging
 import os
 import time
-from typing import Dict, Any, List
-from PIL import Image
-import requests
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import orjson
 
+import torch
 from ultralytics import YOLO
 from dbos import DBOS, SetWorkflowID
 
+from logging_utils import SampledLogger
+from workflows.http_client import ContentHTTPClient
+from workflows.image_cache import load_image_array
+from workflows import inference_pool, pipeline
+
 logger = logging.getLogger(__name__)
+# Per-workflow progress lines go through the sampled proxy (LOG_SAMPLE_RATE)
+log = SampledLogger(logger)
+
+# Honor the per-worker thread budget set in main.py (OMP_NUM_THREADS) so four
+# concurrent workflows don't each spin up an all-cores PyTorch pool
+_TORCH_THREADS = int(os.getenv('OMP_NUM_THREADS', '0') or '0')
+if _TORCH_THREADS > 0:
+    torch.set_num_threads(_TORCH_THREADS)
+    torch.set_num_interop_threads(1)
+
+# Serve models through ONNX Runtime (YOLO_USE_ONNX=1): ultralytics loads the
+# exported .onnx with an onnxruntime session and fused/optimized kernels while
+# keeping the same predict/result API. Models are exported once on first load
+# if the .onnx file is missing (the Docker image pre-exports the default).
+_USE_ONNX = os.getenv('YOLO_USE_ONNX', '0') == '1'
+
+# Run FP16 inference on CUDA: ~2x throughput on tensor cores at near-identical
+# accuracy for YOLO detection. Opt out with YOLO_HALF=0. ONNX Runtime manages
+# its own precision, so half only applies to the PyTorch backend.
+_HALF = torch.cuda.is_available() and os.getenv('YOLO_HALF', '1') != '0' and not _USE_ONNX
 
 # Global model instance (loaded once)
 # YOLO model cache (one model per variant)
@@ -35,51 +59,105 @@ def get_yolo_model(model='yolo11n'):
     """
     global _yolo_models
     if model not in _yolo_models:
-        logger.info(f"Loading YOLO model: {model}...")
+        logger.info("Loading YOLO model: %s...", model)
         model_file = f'{model}.pt'
-        _yolo_models[model] = YOLO(model_file)
-        logger.info(f"✓ YOLO model loaded: {model}")
+        if _USE_ONNX:
+            onnx_file = f'{model}.onnx'
+            if not os.path.exists(onnx_file):
+                logger.info("Exporting %s to ONNX (one-time)...", model)
+                YOLO(model_file).export(format='onnx', dynamic=True, simplify=True)
+            yolo = YOLO(onnx_file)
+        else:
+            yolo = YOLO(model_file)
+            # Fuse conv+bn layers once at load instead of on first predict
+            yolo.fuse()
+            if _HALF:
+                yolo.to('cuda')
+                logger.info("  FP16 inference enabled for %s", model)
+        _yolo_models[model] = yolo
+        logger.info("✓ YOLO model loaded: %s", model)
     return _yolo_models[model]
 
 
-class ContentHTTPClient:
-    """HTTP client for accessing content via simple-content API"""
-
-    def __init__(self, base_url: str):
-        self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
-
-    def download_content(self, content_id: str) -> bytes:
-        """Download content binary data"""
-        url = f"{self.base_url}/api/v1/contents/{content_id}/download"
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-        return response.content
-
-    def upload_derived(self, parent_id: str, derivation_type: str, variant: str,
-                      data: bytes, filename: str) -> str:
-        """Upload derived content using multipart form"""
-        url = f"{self.base_url}/api/v1/contents/{parent_id}/derived"
-
-        files = {
-            'file': (filename, data, 'application/json')
+def _make_client(metadata: Dict[str, Any]) -> ContentHTTPClient:
+    """Build a content API client from metadata/environment"""
+    content_api_url = metadata.get('content_api_url') or \
+                     os.environ.get('CONTENT_API_URL', 'http://localhost:8080')
+    return ContentHTTPClient(content_api_url)
+
+
+def _parse_detections(result, names) -> List[Dict[str, Any]]:
+    """Convert one YOLO result into the detection dicts we upload"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+
+    # One device->host transfer per field instead of per-box tensor indexing
+    xyxy = boxes.xyxy.cpu().numpy()
+    conf = boxes.conf.cpu().numpy()
+    cls = boxes.cls.cpu().numpy().astype(int)
+
+    return [
+        {
+            'label': names[c],
+            'confidence': float(s),
+            'bounding_box': {
+                'x': float(x1),
+                'y': float(y1),
+                'width': float(x2 - x1),
+                'height': float(y2 - y1)
+            }
         }
-        data_form = {
-            'derivation_type': derivation_type,
-            'variant': variant
+        for (x1, y1, x2, y2), s, c in zip(xyxy, conf, cls)
+    ]
+
+
+def _rescale_detections(detections: List[Dict[str, Any]],
+                        scale: float) -> List[Dict[str, Any]]:
+    """Map detection coordinates from a downscaled decode back to original space"""
+    if scale == 1.0:
+        return detections
+    inverse = 1.0 / scale
+    for detection in detections:
+        bounding_box = detection['bounding_box']
+        for key in ('x', 'y', 'width', 'height'):
+            bounding_box[key] *= inverse
+    return detections
+
+
+def _postprocess_and_upload(client: ContentHTTPClient, content_id: str,
+                            detections: List[Dict[str, Any]], model_variant: str,
+                            image_size: Tuple[int, int],
+                            processing_time_ms: int) -> Dict[str, Any]:
+    """Build the detection result JSON and upload it as derived content"""
+    detection_result = {
+        'objects': detections,
+        'total_objects': len(detections),
+        'processing_time_ms': processing_time_ms,
+        'model': model_variant,
+        'image_size': {
+            'width': image_size[0],
+            'height': image_size[1]
         }
+    }
 
-        response = self.session.post(url, files=files, data=data_form, timeout=30)
-        response.raise_for_status()
+    # Compact C-implemented encoding; serializes numpy scalars natively
+    json_data = orjson.dumps(detection_result, option=orjson.OPT_SERIALIZE_NUMPY)
 
-        result = response.json()
-        # Extract ID from nested or direct response
-        if 'data' in result and 'id' in result['data']:
-            return result['data']['id']
-        elif 'id' in result:
-            return result['id']
-        else:
-            raise ValueError(f"No ID in response: {result}")
+    derived_id = client.upload_derived(
+        parent_id=content_id,
+        derivation_type='object_detection',
+        variant='object_detection_v1',
+        data=json_data,
+        filename='detections.json'
+    )
+
+    return {
+        'success': True,
+        'derived_id': derived_id,
+        'detections_count': len(detections),
+        'processing_time_ms': processing_time_ms
+    }
 
 
 @DBOS.workflow()
@@ -97,94 +175,172 @@ def detect_objects_workflow(content_id: str, metadata: Dict[str, Any] = None) ->
     metadata = metadata or {}
     run_id = DBOS.workflow_id
 
-    logger.info(f"[{run_id}] Starting object detection workflow for content_id={content_id}")
+    log.info("Starting object detection workflow for content_id=%s", content_id,
+             extra={'run_id': run_id})
 
     try:
-        # Get content API URL from environment
-        content_api_url = metadata.get('content_api_url') or \
-                         os.environ.get('CONTENT_API_URL', 'http://localhost:8080')
-
-        client = ContentHTTPClient(content_api_url)
-
-        # Download source image
-        logger.info(f"[{run_id}] Downloading source content...")
-        image_data = client.download_content(content_id)
-        logger.info(f"[{run_id}] Downloaded {len(image_data)} bytes")
+        client = _make_client(metadata)
 
-        # Load image
-        image = Image.open(io.BytesIO(image_data))
-        logger.info(f"[{run_id}] Image loaded: {image.size} {image.mode}")
+        # Download and decode source image (cached across workflows,
+        # downscaled to the resize hint)
+        decoded = load_image_array(client, content_id)
+        image_size = (decoded.width, decoded.height)
+        log.info("Image loaded: %s", image_size, extra={'run_id': run_id})
 
         # Run object detection with configured model
         model_variant = metadata.get('model', 'yolo11n')
-        logger.info(f"[{run_id}] Running object detection (model: {model_variant})...")
         start_time = time.time()
 
-        model = get_yolo_model(model=model_variant)
-        results = model(image, verbose=False)
+        if inference_pool.enabled():
+            detections = inference_pool.detect(model_variant, [decoded.array])[0]
+        else:
+            model = get_yolo_model(model=model_variant)
+            # Decoded arrays are BGR, which is exactly what ultralytics
+            # assumes for ndarray inputs — no PIL round-trip needed
+            results = model(decoded.array, verbose=False, half=_HALF)
+            detections = _parse_detections(results[0], model.names)
 
-        processing_time_ms = int((time.time() - start_time) * 1000)
+        # Report coordinates in original image space
+        detections = _rescale_detections(detections, decoded.scale)
 
-        # Parse detection results
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                detection = {
-                    'label': model.names[int(box.cls[0])],
-                    'confidence': float(box.conf[0]),
-                    'bounding_box': {
-                        'x': float(box.xyxy[0][0]),
-                        'y': float(box.xyxy[0][1]),
-                        'width': float(box.xyxy[0][2] - box.xyxy[0][0]),
-                        'height': float(box.xyxy[0][3] - box.xyxy[0][1])
-                    }
-                }
-                detections.append(detection)
-
-        logger.info(f"[{run_id}] Detected {len(detections)} objects in {processing_time_ms}ms")
-
-        # Create detection result JSON
-        detection_result = {
-            'objects': detections,
-            'total_objects': len(detections),
-            'processing_time_ms': processing_time_ms,
-            'model': model_variant,
-            'image_size': {
-                'width': image.size[0],
-                'height': image.size[1]
-            }
-        }
+        processing_time_ms = int((time.time() - start_time) * 1000)
 
         # Upload as derived content
-        logger.info(f"[{run_id}] Uploading detection results...")
-        json_data = json.dumps(detection_result, indent=2).encode('utf-8')
+        outcome = _postprocess_and_upload(client, content_id, detections,
+                                          model_variant, image_size, processing_time_ms)
 
-        derived_id = client.upload_derived(
-            parent_id=content_id,
-            derivation_type='object_detection',
-            variant='object_detection_v1',
-            data=json_data,
-            filename='detections.json'
-        )
+        log.info("Detected %d objects in %dms, derived_id=%s",
+                 len(detections), processing_time_ms, outcome['derived_id'],
+                 extra={'run_id': run_id})
 
-        logger.info(f"[{run_id}] Derived content written: {derived_id}")
-        logger.info(f"[{run_id}] Object detection workflow completed successfully")
-
-        return {
-            'success': True,
-            'derived_id': derived_id,
-            'detections_count': len(detections),
-            'processing_time_ms': processing_time_ms
-        }
+        return outcome
 
     except Exception as e:
-        logger.error(f"[{run_id}] Object detection failed: {e}", exc_info=True)
+        log.error("Object detection failed: %s", e, exc_info=True,
+                  extra={'run_id': run_id})
         return {
             'success': False,
             'error': str(e)
         }
 
 
-# Export workflow
-__all__ = ['detect_objects_workflow']
+@DBOS.workflow()
+def detect_objects_batch_workflow(content_ids: List[str],
+                                  metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    DBOS workflow for batched object detection
+
+    Runs a single YOLO forward pass over all downloadable images instead of
+    one model call per image; per-image failures do not fail the batch.
+
+    Args:
+        content_ids: IDs of content to process (same model variant for all)
+        metadata: Optional metadata (e.g., model config, confidence threshold)
+
+    Returns:
+        List of per-content result dictionaries, aligned with content_ids
+    """
+    metadata = metadata or {}
+    run_id = DBOS.workflow_id
+
+    log.info("Starting batched object detection for %d contents",
+             len(content_ids), extra={'run_id': run_id})
+
+    try:
+        client = _make_client(metadata)
+    except Exception as e:
+        log.error("Client setup failed: %s", e, exc_info=True,
+                  extra={'run_id': run_id})
+        return [{'success': False, 'error': str(e)} for _ in content_ids]
+
+    model_variant = metadata.get('model', 'yolo11n')
+
+    outcomes: Dict[int, Dict[str, Any]] = {}
+    decoded_images = []
+    pending = []  # (index, content_id) pairs that downloaded successfully
+
+    # Download stage on the I/O pool: transfers overlap each other (and any
+    # executor prefetch already in flight lands as a cache hit here)
+    download_futures = [pipeline.io_pool().submit(load_image_array, client, content_id)
+                        for content_id in content_ids]
+    for index, (content_id, future) in enumerate(zip(content_ids, download_futures)):
+        try:
+            decoded_images.append(future.result())
+            pending.append((index, content_id))
+        except Exception as e:
+            log.error("Download failed for content_id=%s: %s", content_id, e,
+                      extra={'run_id': run_id})
+            outcomes[index] = {'success': False, 'error': str(e)}
+
+    if decoded_images:
+        start_time = time.time()
+        detections_per_image = None
+
+        # Single forward pass over the whole batch; a failure here (e.g. an
+        # unknown model variant) fans out as per-intent errors so it cannot
+        # fail intents outside this batch's contract
+        try:
+            if inference_pool.enabled():
+                detections_per_image = inference_pool.detect(
+                    model_variant, [decoded.array for decoded in decoded_images]
+                )
+            else:
+                model = get_yolo_model(model=model_variant)
+                results = model([decoded.array for decoded in decoded_images],
+                                verbose=False, half=_HALF)
+                detections_per_image = [_parse_detections(result, model.names)
+                                        for result in results]
+        except Exception as e:
+            log.error("Batch inference failed: %s", e, exc_info=True,
+                      extra={'run_id': run_id})
+            for index, _content_id in pending:
+                outcomes[index] = {'success': False, 'error': str(e)}
+
+    if decoded_images and detections_per_image is not None:
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        log.info("Inference over %d images in %dms",
+                 len(decoded_images), processing_time_ms, extra={'run_id': run_id})
+
+        # Upload stage on the I/O pool: derived-content posts overlap instead
+        # of serializing after inference
+        upload_futures = []
+        for (index, content_id), decoded, detections in zip(pending, decoded_images,
+                                                            detections_per_image):
+            detections = _rescale_detections(detections, decoded.scale)
+            upload_futures.append((index, content_id, pipeline.io_pool().submit(
+                _postprocess_and_upload, client, content_id, detections,
+                model_variant, (decoded.width, decoded.height), processing_time_ms
+            )))
+        for index, content_id, future in upload_futures:
+            try:
+                outcomes[index] = future.result()
+            except Exception as e:
+                log.error("Postprocess failed for content_id=%s: %s", content_id, e,
+                          exc_info=True, extra={'run_id': run_id})
+                outcomes[index] = {'success': False, 'error': str(e)}
+
+    log.info("Batched object detection completed", extra={'run_id': run_id})
+    return [outcomes[index] for index in range(len(content_ids))]
+
+
+def _warm_models():
+    """
+    Load the default model at import and run one dummy inference
+
+    The dummy pass triggers CUDA kernel compilation / MKL-DNN layout
+    optimization once at startup instead of on the first real workflow.
+    """
+    model = get_yolo_model(model=os.getenv('YOLO_MODEL', 'yolo11n'))
+    model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False, half=_HALF)
+    logger.info("✓ YOLO model warmed up")
+
+
+# Warm at import: the worker is long-lived, so pay the cold start here
+# rather than on the first polled intent (skip in dev with SKIP_MODEL_WARMUP=1).
+# With the inference pool enabled, only pool worker processes hold models.
+if os.getenv('SKIP_MODEL_WARMUP') != '1' and inference_pool.owns_models():
+    _warm_models()
+
+
+# Export workflows
+__all__ = ['detect_objects_workflow', 'detect_objects_batch_workflow']
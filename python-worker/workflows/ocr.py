@@ -2,20 +2,25 @@
 OCR Workflow using PaddleOCR
 """
 
-import io
-import json
 import logging
 import os
 import time
-from typing import Dict, Any, List
-from PIL import Image
-import requests
+from typing import Dict, Any, List, Tuple
 import numpy as np
+import orjson
 
+import paddle
 from paddleocr import PaddleOCR
 from dbos import DBOS
 
+from logging_utils import SampledLogger
+from workflows.http_client import ContentHTTPClient
+from workflows.image_cache import load_image_array
+from workflows import inference_pool, pipeline
+
 logger = logging.getLogger(__name__)
+# Per-workflow progress lines go through the sampled proxy (LOG_SAMPLE_RATE)
+log = SampledLogger(logger)
 
 # OCR engine cache (one engine per language)
 _ocr_engines = {}
@@ -33,54 +38,141 @@ def get_ocr_engine(lang='en'):
     """
     global _ocr_engines
     if lang not in _ocr_engines:
-        logger.info(f"Loading PaddleOCR engine for language: {lang}...")
+        logger.info("Loading PaddleOCR engine for language: %s...", lang)
         # Enable textline orientation for rotated text
-        _ocr_engines[lang] = PaddleOCR(
-            use_textline_orientation=True,
-            lang=lang
-        )
-        logger.info(f"✓ PaddleOCR engine loaded for language: {lang}")
+        kwargs = {
+            'use_textline_orientation': True,
+            'lang': lang
+        }
+        if paddle.device.is_compiled_with_cuda():
+            # FP16 halves weight memory and roughly doubles GPU throughput
+            kwargs['precision'] = 'fp16'
+        else:
+            # MKL-DNN kernels for CPU inference, capped to the per-worker
+            # thread budget set in main.py
+            kwargs['enable_mkldnn'] = True
+            paddle_threads = int(os.getenv('PADDLE_NUM_THREADS', '0') or '0')
+            if paddle_threads > 0:
+                kwargs['cpu_threads'] = paddle_threads
+        try:
+            _ocr_engines[lang] = PaddleOCR(**kwargs)
+        except TypeError:
+            # Older paddleocr without precision/mkldnn kwargs
+            _ocr_engines[lang] = PaddleOCR(use_textline_orientation=True, lang=lang)
+        logger.info("✓ PaddleOCR engine loaded for language: %s", lang)
     return _ocr_engines[lang]
 
 
-class ContentHTTPClient:
-    """HTTP client for accessing content via simple-content API"""
+def _make_client(metadata: Dict[str, Any]) -> ContentHTTPClient:
+    """Build a content API client from metadata/environment"""
+    content_api_url = metadata.get('content_api_url') or \
+                     os.environ.get('CONTENT_API_URL', 'http://localhost:8080')
+    return ContentHTTPClient(content_api_url)
 
-    def __init__(self, base_url: str):
-        self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
 
-    def download_content(self, content_id: str) -> bytes:
-        """Download content binary data"""
-        url = f"{self.base_url}/api/v1/contents/{content_id}/download"
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-        return response.content
+def _parse_text_blocks(ocr_result,
+                       scale: float = 1.0) -> Tuple[List[Dict[str, Any]], List[str], float]:
+    """
+    Convert one per-image PaddleOCR result dict into text blocks
 
-    def upload_derived(self, parent_id: str, derivation_type: str, variant: str,
-                      data: bytes, filename: str) -> str:
-        """Upload derived content using multipart form"""
-        url = f"{self.base_url}/api/v1/contents/{parent_id}/derived"
+    PaddleOCR v3.x returns per image: {'rec_texts': [...], 'rec_scores': [...],
+    'rec_polys': [...]}. When the image was downscaled before OCR, `scale`
+    maps polygon/box coordinates back to original image space.
 
-        files = {
-            'file': (filename, data, 'application/json')
-        }
-        data_form = {
-            'derivation_type': derivation_type,
-            'variant': variant
+    Returns:
+        (text_blocks, full_text_lines, total_confidence)
+    """
+    text_blocks = []
+    full_text_lines = []
+    confidences = []
+
+    if not isinstance(ocr_result, dict):
+        return text_blocks, full_text_lines, 0.0
+
+    rec_texts = ocr_result.get('rec_texts', [])
+    rec_scores = ocr_result.get('rec_scores', [])
+    rec_polys = ocr_result.get('rec_polys', [])
+
+    for i in range(len(rec_texts)):
+        text = rec_texts[i]
+        confidence = float(rec_scores[i]) if i < len(rec_scores) else 0.0
+        polygon = rec_polys[i] if i < len(rec_polys) else None
+
+        if polygon is not None and len(polygon) >= 4:
+            # Vectorized bounding box: one min/max reduction over the points
+            # instead of per-coordinate Python iteration
+            points = np.asarray(polygon, dtype=np.float32)
+            if scale != 1.0:
+                # Report coordinates in original image space
+                points = points / scale
+            x_min, y_min = points.min(axis=0)
+            x_max, y_max = points.max(axis=0)
+
+            text_block = {
+                'text': text,
+                'confidence': confidence,
+                'bounding_box': {
+                    'x': float(x_min),
+                    'y': float(y_min),
+                    'width': float(x_max - x_min),
+                    'height': float(y_max - y_min)
+                },
+                'polygon': points.tolist()
+            }
+
+            text_blocks.append(text_block)
+            full_text_lines.append(text)
+            confidences.append(confidence)
+
+    total_confidence = float(np.sum(confidences)) if confidences else 0.0
+    return text_blocks, full_text_lines, total_confidence
+
+
+def _postprocess_and_upload(client: ContentHTTPClient, content_id: str,
+                            ocr_result, language: str,
+                            image_size: Tuple[int, int],
+                            processing_time_ms: int,
+                            scale: float = 1.0) -> Dict[str, Any]:
+    """Build the OCR result JSON from one per-image result and upload it"""
+    text_blocks, full_text_lines, total_confidence = _parse_text_blocks(ocr_result, scale)
+
+    # Calculate average confidence
+    avg_confidence = total_confidence / len(text_blocks) if text_blocks else 0.0
+    full_text = '\n'.join(full_text_lines)
+
+    result_json = {
+        'text': full_text,
+        'blocks': text_blocks,
+        'total_blocks': len(text_blocks),
+        'average_confidence': avg_confidence,
+        'processing_time_ms': processing_time_ms,
+        'engine': 'paddleocr',
+        'language': language,
+        'image_size': {
+            'width': image_size[0],
+            'height': image_size[1]
         }
+    }
 
-        response = self.session.post(url, files=files, data=data_form, timeout=30)
-        response.raise_for_status()
+    # Compact C-implemented encoding (UTF-8 by default); serializes numpy
+    # scalars natively
+    json_data = orjson.dumps(result_json, option=orjson.OPT_SERIALIZE_NUMPY)
 
-        result = response.json()
-        # Extract ID from nested or direct response
-        if 'data' in result and 'id' in result['data']:
-            return result['data']['id']
-        elif 'id' in result:
-            return result['id']
-        else:
-            raise ValueError(f"No ID in response: {result}")
+    derived_id = client.upload_derived(
+        parent_id=content_id,
+        derivation_type='ocr_text',
+        variant='paddleocr_v1',
+        data=json_data,
+        filename='ocr.json'
+    )
+
+    return {
+        'success': True,
+        'derived_id': derived_id,
+        'text_blocks_count': len(text_blocks),
+        'average_confidence': avg_confidence,
+        'processing_time_ms': processing_time_ms
+    }
 
 
 @DBOS.workflow()
@@ -98,126 +190,167 @@ def ocr_workflow(content_id: str, metadata: Dict[str, Any] = None) -> Dict[str,
     metadata = metadata or {}
     run_id = DBOS.workflow_id
 
-    logger.info(f"[{run_id}] Starting OCR workflow for content_id={content_id}")
+    log.info("Starting OCR workflow for content_id=%s", content_id,
+             extra={'run_id': run_id})
 
     try:
-        # Get content API URL from environment
-        content_api_url = metadata.get('content_api_url') or \
-                         os.environ.get('CONTENT_API_URL', 'http://localhost:8080')
-
-        client = ContentHTTPClient(content_api_url)
+        client = _make_client(metadata)
 
-        # Download source image
-        logger.info(f"[{run_id}] Downloading source content...")
-        image_data = client.download_content(content_id)
-        logger.info(f"[{run_id}] Downloaded {len(image_data)} bytes")
-
-        # Load image
-        image = Image.open(io.BytesIO(image_data))
-        logger.info(f"[{run_id}] Image loaded: {image.size} {image.mode}")
-
-        # Convert PIL Image to numpy array for PaddleOCR
-        image_array = np.array(image)
+        # Download and decode source image (cached across workflows,
+        # downscaled to the resize hint)
+        decoded = load_image_array(client, content_id)
+        image_array = decoded.array
+        image_size = (decoded.width, decoded.height)
+        log.info("Image loaded: %s", image_size, extra={'run_id': run_id})
 
         # Run OCR with configured language
         language = metadata.get('language', 'en')
-        logger.info(f"[{run_id}] Running OCR extraction (language: {language})...")
         start_time = time.time()
 
-        ocr_engine = get_ocr_engine(lang=language)
-        result = ocr_engine.ocr(image_array)
+        if inference_pool.enabled():
+            result = inference_pool.ocr(language, [image_array])
+        else:
+            ocr_engine = get_ocr_engine(lang=language)
+            result = ocr_engine.ocr(image_array)
 
         processing_time_ms = int((time.time() - start_time) * 1000)
 
-        # Parse OCR results
-        # PaddleOCR v3.x returns: [{'rec_texts': [...], 'rec_scores': [...], 'rec_polys': [...]}]
-        text_blocks = []
-        full_text_lines = []
-        total_confidence = 0.0
-
-        if result and len(result) > 0 and isinstance(result[0], dict):
-            ocr_result = result[0]
-            rec_texts = ocr_result.get('rec_texts', [])
-            rec_scores = ocr_result.get('rec_scores', [])
-            rec_polys = ocr_result.get('rec_polys', [])
-
-            for i in range(len(rec_texts)):
-                text = rec_texts[i]
-                confidence = float(rec_scores[i]) if i < len(rec_scores) else 0.0
-                polygon = rec_polys[i] if i < len(rec_polys) else None
-
-                if polygon is not None and len(polygon) >= 4:
-                    # Calculate bounding box from polygon points
-                    x_coords = [point[0] for point in polygon]
-                    y_coords = [point[1] for point in polygon]
-
-                    text_block = {
-                        'text': text,
-                        'confidence': confidence,
-                        'bounding_box': {
-                            'x': float(min(x_coords)),
-                            'y': float(min(y_coords)),
-                            'width': float(max(x_coords) - min(x_coords)),
-                            'height': float(max(y_coords) - min(y_coords))
-                        },
-                        'polygon': [[float(p[0]), float(p[1])] for p in polygon]
-                    }
-
-                    text_blocks.append(text_block)
-                    full_text_lines.append(text)
-                    total_confidence += confidence
-
-        # Calculate average confidence
-        avg_confidence = total_confidence / len(text_blocks) if text_blocks else 0.0
-        full_text = '\n'.join(full_text_lines)
-
-        logger.info(f"[{run_id}] Extracted {len(text_blocks)} text blocks in {processing_time_ms}ms")
-
-        # Create OCR result JSON
-        ocr_result = {
-            'text': full_text,
-            'blocks': text_blocks,
-            'total_blocks': len(text_blocks),
-            'average_confidence': avg_confidence,
-            'processing_time_ms': processing_time_ms,
-            'engine': 'paddleocr',
-            'language': language,
-            'image_size': {
-                'width': image.size[0],
-                'height': image.size[1]
-            }
-        }
-
         # Upload as derived content
-        logger.info(f"[{run_id}] Uploading OCR results...")
-        json_data = json.dumps(ocr_result, indent=2, ensure_ascii=False).encode('utf-8')
+        per_image_result = result[0] if result and len(result) > 0 else None
+        outcome = _postprocess_and_upload(client, content_id, per_image_result,
+                                          language, image_size, processing_time_ms,
+                                          scale=decoded.scale)
 
-        derived_id = client.upload_derived(
-            parent_id=content_id,
-            derivation_type='ocr_text',
-            variant='paddleocr_v1',
-            data=json_data,
-            filename='ocr.json'
-        )
+        log.info("Extracted %d text blocks in %dms, derived_id=%s",
+                 outcome['text_blocks_count'], processing_time_ms,
+                 outcome['derived_id'], extra={'run_id': run_id})
 
-        logger.info(f"[{run_id}] Derived content written: {derived_id}")
-        logger.info(f"[{run_id}] OCR workflow completed successfully")
-
-        return {
-            'success': True,
-            'derived_id': derived_id,
-            'text_blocks_count': len(text_blocks),
-            'average_confidence': avg_confidence,
-            'processing_time_ms': processing_time_ms
-        }
+        return outcome
 
     except Exception as e:
-        logger.error(f"[{run_id}] OCR failed: {e}", exc_info=True)
+        log.error("OCR failed: %s", e, exc_info=True, extra={'run_id': run_id})
         return {
             'success': False,
             'error': str(e)
         }
 
 
-# Export workflow
-__all__ = ['ocr_workflow']
+@DBOS.workflow()
+def ocr_batch_workflow(content_ids: List[str],
+                       metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    DBOS workflow for batched OCR text extraction
+
+    Runs a single PaddleOCR pass over all downloadable images instead of one
+    engine call per image; per-image failures do not fail the batch.
+
+    Args:
+        content_ids: IDs of content to process (same language for all)
+        metadata: Optional metadata (e.g., language, confidence threshold)
+
+    Returns:
+        List of per-content result dictionaries, aligned with content_ids
+    """
+    metadata = metadata or {}
+    run_id = DBOS.workflow_id
+    language = metadata.get('language', 'en')
+
+    log.info("Starting batched OCR for %d contents (language: %s)",
+             len(content_ids), language, extra={'run_id': run_id})
+
+    try:
+        client = _make_client(metadata)
+    except Exception as e:
+        log.error("Client setup failed: %s", e, exc_info=True,
+                  extra={'run_id': run_id})
+        return [{'success': False, 'error': str(e)} for _ in content_ids]
+
+    outcomes: Dict[int, Dict[str, Any]] = {}
+    decoded_images = []
+    pending = []  # (index, content_id) pairs that downloaded successfully
+
+    # Download stage on the I/O pool: transfers overlap each other (and any
+    # executor prefetch already in flight lands as a cache hit here)
+    download_futures = [pipeline.io_pool().submit(load_image_array, client, content_id)
+                        for content_id in content_ids]
+    for index, (content_id, future) in enumerate(zip(content_ids, download_futures)):
+        try:
+            decoded_images.append(future.result())
+            pending.append((index, content_id))
+        except Exception as e:
+            log.error("Download failed for content_id=%s: %s", content_id, e,
+                      extra={'run_id': run_id})
+            outcomes[index] = {'success': False, 'error': str(e)}
+
+    if decoded_images:
+        start_time = time.time()
+        arrays = [decoded.array for decoded in decoded_images]
+        results = None
+        inference_failed = False
+
+        # Single engine pass over the whole batch; a failure here (e.g. an
+        # unsupported language) fans out as per-intent errors so it cannot
+        # fail intents outside this batch's contract
+        try:
+            if inference_pool.enabled():
+                results = inference_pool.ocr(language, arrays)
+            else:
+                ocr_engine = get_ocr_engine(lang=language)
+                results = ocr_engine.ocr(arrays)
+        except Exception as e:
+            log.error("Batch OCR failed: %s", e, exc_info=True,
+                      extra={'run_id': run_id})
+            inference_failed = True
+            for index, _content_id in pending:
+                outcomes[index] = {'success': False, 'error': str(e)}
+
+    if decoded_images and not inference_failed:
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        log.info("OCR over %d images in %dms", len(arrays), processing_time_ms,
+                 extra={'run_id': run_id})
+
+        # Upload stage on the I/O pool: derived-content posts overlap instead
+        # of serializing after inference
+        upload_futures = []
+        for batch_pos, (index, content_id) in enumerate(pending):
+            per_image_result = results[batch_pos] if results and batch_pos < len(results) \
+                else None
+            decoded = decoded_images[batch_pos]
+            upload_futures.append((index, content_id, pipeline.io_pool().submit(
+                _postprocess_and_upload, client, content_id, per_image_result,
+                language, (decoded.width, decoded.height), processing_time_ms,
+                scale=decoded.scale
+            )))
+        for index, content_id, future in upload_futures:
+            try:
+                outcomes[index] = future.result()
+            except Exception as e:
+                log.error("Postprocess failed for content_id=%s: %s", content_id, e,
+                          exc_info=True, extra={'run_id': run_id})
+                outcomes[index] = {'success': False, 'error': str(e)}
+
+    log.info("Batched OCR completed", extra={'run_id': run_id})
+    return [outcomes[index] for index in range(len(content_ids))]
+
+
+def _warm_models():
+    """
+    Load the default OCR engine at import and run one dummy pass
+
+    The dummy pass triggers CUDA kernel compilation / MKL-DNN layout
+    optimization once at startup instead of on the first real workflow.
+    """
+    engine = get_ocr_engine(lang=os.getenv('OCR_LANG', 'en'))
+    engine.ocr(np.zeros((640, 640, 3), dtype=np.uint8))
+    logger.info("✓ PaddleOCR engine warmed up")
+
+
+# Warm at import: the worker is long-lived, so pay the cold start here
+# rather than on the first polled intent (skip in dev with SKIP_MODEL_WARMUP=1).
+# With the inference pool enabled, only pool worker processes hold models.
+if os.getenv('SKIP_MODEL_WARMUP') != '1' and inference_pool.owns_models():
+    _warm_models()
+
+
+# Export workflows
+__all__ = ['ocr_workflow', 'ocr_batch_workflow']
@@ -0,0 +1,35 @@
+"""
+Shared thread pool for the I/O stages of ML workflows
+
+Each workflow is download (network) → infer (CPU/GPU) → upload (network).
+Run strictly sequentially, throughput is the sum of the stage times; with the
+network stages on this pool, batch downloads/uploads overlap each other and
+the executor can prefetch the next chunk's images while the current chunk is
+on the GPU, so steady-state throughput approaches the slowest stage instead.
+
+PIPELINE_IO_WORKERS (default 4) caps in-flight transfers, which also bounds
+how many decoded prefetched images can pile up ahead of inference.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_MAX_WORKERS = int(os.getenv('PIPELINE_IO_WORKERS', '4'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def io_pool() -> ThreadPoolExecutor:
+    """Get the process-wide I/O stage pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_MAX_WORKERS,
+                                           thread_name_prefix='pipeline-io')
+    return _pool
+
+
+__all__ = ['io_pool']
@@ -0,0 +1,22 @@
+-- Push notifications for simple-workflow intent pickup.
+--
+-- Installs an AFTER INSERT trigger on workflow.workflow_intent that emits
+-- pg_notify('intent_ready', <intent id>). Workers LISTEN on the channel
+-- (see python-worker/polling.py IntentNotifyListener) and poll immediately
+-- instead of waiting out their idle backoff interval.
+--
+-- Optional: without this trigger workers fall back to timed polling.
+
+CREATE OR REPLACE FUNCTION workflow.notify_intent_ready() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('intent_ready', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS intent_ready_notify ON workflow.workflow_intent;
+
+CREATE TRIGGER intent_ready_notify
+    AFTER INSERT ON workflow.workflow_intent
+    FOR EACH ROW
+    EXECUTE FUNCTION workflow.notify_intent_ready();